@@ -1,29 +1,84 @@
 # executor.py
 import time
 import os
-import numpy as np
-import cv2
+import threading
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+# numpy/cv2 are slow to import and only needed for mock screenshots, so they
+# are loaded on first render (see _load_cv)
+_np = None
+_cv2 = None
+_BLANK = None
+_PNG_PARAMS = None
+_load_lock = threading.Lock()
+
+# Steps have no data dependency on each other, so they run on a thread pool
+MAX_WORKERS = 8
+
+def _load_cv():
+    """Import numpy/cv2 and build the shared frame template on first use."""
+    global _np, _cv2, _BLANK, _PNG_PARAMS
+    if _cv2 is None:
+        with _load_lock:
+            if _cv2 is None:
+                import numpy as np
+                import cv2
+
+                _np = np
+                # Every mock frame starts from the same blank canvas, so build it once
+                _BLANK = np.full((240, 240, 3), 220, dtype=np.uint8)
+                # Mock frames are never inspected at high fidelity; skip zlib entirely
+                _PNG_PARAMS = [cv2.IMWRITE_PNG_COMPRESSION, 0]
+                _cv2 = cv2
+    return _np, _cv2
 
 def mock_render(step_idx: int):
     """Create a mock screenshot image with step number"""
-    img = np.ones((240, 240, 3), dtype=np.uint8) * 220
+    _, cv2 = _load_cv()
+    img = _BLANK.copy()
     cv2.putText(img, f"Step {step_idx}", (40, 130), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
     return img
 
-def execute_steps(step_list: list[str]) -> list[str]:
-    print("\n[Executor] Starting execution...\n")
-    results = []
-    os.makedirs("images", exist_ok=True)
+def _write_frame(path: str, frame) -> None:
+    _, cv2 = _load_cv()
+    ok, buf = cv2.imencode(".png", frame, _PNG_PARAMS)
+    if not ok:
+        raise RuntimeError(f"Failed to encode {path}")
+    with open(path, "wb") as f:
+        f.write(buf.tobytes())
 
-    for idx, step in enumerate(step_list, 1):
-        print(f"🟢 Executing Step {idx}: {step}")
-        time.sleep(1)
+def _run_step(idx: int, step: str, delay: float, render: bool) -> str:
+    if delay:
+        time.sleep(delay)
+
+    # 🧪 Create and save a mock screenshot
+    if render:
+        _write_frame(f"images/step_{idx:02}_mock.png", mock_render(idx))
+
+    return f"{step} — SUCCESS"
+
+def execute_steps(step_list: Iterable[str], delay: Optional[float] = None) -> list[str]:
+    # Simulated per-step latency; defaults to none so tests and benchmarks run at full speed
+    if delay is None:
+        delay = float(os.getenv("EDITH_STEP_DELAY", "0"))
+    render = os.getenv("EDITH_MOCK_RENDER", "1") == "1"
+
+    print("\n[Executor] Starting execution...\n")
+    if render:
+        os.makedirs("images", exist_ok=True)
 
-        # 🧪 Create and save a mock screenshot
-        frame = mock_render(idx)
-        cv2.imwrite(f"images/step_{idx:02}_mock.png", frame)
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        pending = []
+        # step_list may be a generator (e.g. a streamed plan); each step is
+        # dispatched as soon as it arrives
+        for idx, step in enumerate(step_list, 1):
+            print(f"🟢 Executing Step {idx}: {step}")
+            pending.append(pool.submit(_run_step, idx, step, delay, render))
 
-        results.append(f"{step} — SUCCESS")
+        # Collect in submission order so results line up with step_list
+        results = [future.result() for future in pending]
 
     print("\n[Executor] Execution complete.\n")
     return results
@@ -1,8 +1,14 @@
 # planner.py
 
 import os
+import json
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Optional
+import httpx
 from langchain_openai import ChatOpenAI
-from langchain.schema import HumanMessage
+from langchain.schema import HumanMessage, SystemMessage
 
 # Get OpenAI API key from environment variables
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -10,20 +16,255 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 if not OPENAI_API_KEY:
     raise ValueError("OPENAI_API_KEY environment variable is required")
 
-llm = ChatOpenAI(
-    model_name="gpt-4",
-    temperature=0.2,
-    openai_api_key=OPENAI_API_KEY
-)
+# A small model handles short UI breakdowns well; the supervisor escalates to
+# the fallback model only when the verifier rejects a run
+PLANNER_MODEL = os.getenv("EDITH_PLANNER_MODEL", "gpt-4o-mini")
+FALLBACK_MODEL = os.getenv("EDITH_PLANNER_FALLBACK_MODEL", "gpt-4o")
 
-def plan_task(user_goal: str):
-    prompt = f"""
-You are an intelligent task planner for Android UI automation testing.
+# Upper bound on in-flight async planner requests, to stay under the account's RPM limit
+MAX_CONCURRENT_REQUESTS = 8
+
+
+try:
+    import h2  # noqa: F401  (optional; lets httpx multiplex requests over HTTP/2)
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
+_HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+_HTTP_TIMEOUT = httpx.Timeout(600.0, connect=5.0)
+
+# One pooled HTTP client shared by every planner model, so repeated and
+# batched calls reuse warm TCP/TLS connections instead of re-handshaking
+http_client = httpx.Client(http2=_HTTP2, limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT)
+
+# Pooled client for the async planner. Its connections belong to the event
+# loop that opened them, so drive aplan_task/aplan_many from one loop (a
+# single asyncio.run) per process
+async_http_client = httpx.AsyncClient(http2=_HTTP2, limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT)
+
+
+def _make_llm(model: str) -> ChatOpenAI:
+    return ChatOpenAI(
+        model_name=model,
+        temperature=0.2,
+        openai_api_key=OPENAI_API_KEY,
+        http_client=http_client,
+        http_async_client=async_http_client,
+        # The OpenAI client retries 429s itself and honours the retry-after header
+        max_retries=6,
+        # JSON mode guarantees the reply parses as a JSON object
+        model_kwargs={"response_format": {"type": "json_object"}}
+    )
+
+
+llm = _make_llm(PLANNER_MODEL)
+_llms = {PLANNER_MODEL: llm}
+
+
+def _get_llm(model: Optional[str] = None) -> ChatOpenAI:
+    model = model or PLANNER_MODEL
+    if model not in _llms:
+        _llms[model] = _make_llm(model)
+    return _llms[model]
+
+# Plans are cached per (model, prompt) in memory (LRU), and optionally on disk
+# so repeated runs (e.g. CI) reuse earlier plans
+PLAN_CACHE_SIZE = 512
+PLAN_CACHE_DIR = os.getenv("EDITH_PLANNER_CACHE_DIR")
+_plan_cache: "OrderedDict[tuple[str, str], tuple[str, ...]]" = OrderedDict()
+
+
+# Instructions shared by every planner request live in one reusable
+# SystemMessage, so only the goal-specific part is built per call and every
+# request starts with the same prefix
+_SYSTEM_MESSAGE = SystemMessage(content="""You are an intelligent task planner for Android UI automation testing.
 Given a high-level goal, break it down into step-by-step UI actions.
+Reply with JSON only. Each step is one short string prefixed with its number, e.g. "1. Open Settings".""")
+
+_GOAL_TEMPLATE = """Reply in the form {{"steps": ["1. ...", "2. ..."]}}.
+
+Goal: {goal}"""
+
+_BATCH_TEMPLATE = """Plan each of the goals below separately.
+Reply in the form {{"goals": [{{"id": <goal number>, "steps": ["1. ...", "2. ..."]}}, ...]}}.
+
+Goals:
+{goals}"""
+
+
+def _build_prompt(user_goal: str) -> str:
+    return _GOAL_TEMPLATE.format(goal=user_goal)
+
+
+def _build_batch_prompt(goals: list[str]) -> str:
+    numbered_goals = "\n".join(f"{idx}. {goal}" for idx, goal in enumerate(goals, 1))
+    return _BATCH_TEMPLATE.format(goals=numbered_goals)
+
+
+def _messages(prompt: str) -> list:
+    return [_SYSTEM_MESSAGE, HumanMessage(content=prompt)]
+
+
+def _parse_steps(content: str) -> list[str]:
+    # json.JSONDecodeError is itself a ValueError
+    try:
+        steps = json.loads(content)["steps"]
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Planner reply has no steps: {content[:200]!r}") from e
+    return _check_steps(steps)
+
+
+def _check_steps(steps) -> list[str]:
+    if not isinstance(steps, list) or not all(isinstance(step, str) for step in steps):
+        raise ValueError(f"Planner steps are not a list of strings: {steps!r}")
+    return steps
+
+
+# Used to pull complete step strings out of a partially streamed JSON reply
+_step_decoder = json.JSONDecoder()
+
+
+def _iter_streamed_steps(chunks):
+    """Yield each string of a streamed {"steps": [...]} reply once it is complete.
+
+    The whole reply is parsed once the stream ends; raises ValueError if it is
+    malformed or disagrees with the steps already yielded.
+    """
+    buffer = ""
+    pos = None  # Position inside the steps array, once its "[" has arrived
+    yielded = []
+    for chunk in chunks:
+        buffer += chunk
+        if pos is None:
+            key = buffer.find('"steps"')
+            start = buffer.find("[", key) if key != -1 else -1
+            if start == -1:
+                continue
+            pos = start + 1
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buffer) or buffer[pos] != '"':
+                break
+            try:
+                step, pos = _step_decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # String not fully received yet; wait for the next chunk
+                break
+            yielded.append(step)
+            yield step
+
+    steps = _parse_steps(buffer)
+    if steps[:len(yielded)] != yielded:
+        raise ValueError("Streamed plan steps do not match the final reply")
+    yield from steps[len(yielded):]
+
+
+def _plan_cache_path(model: str, prompt: str) -> str:
+    key = hashlib.sha256(f"{model}\n{_SYSTEM_MESSAGE.content}\n{prompt}".encode("utf-8")).hexdigest()
+    return os.path.join(PLAN_CACHE_DIR, f"{key}.json")
+
+
+def _cache_get(model: str, prompt: str):
+    key = (model, prompt)
+    if key in _plan_cache:
+        _plan_cache.move_to_end(key)
+        return _plan_cache[key]
+    if PLAN_CACHE_DIR:
+        path = _plan_cache_path(model, prompt)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                steps = tuple(json.load(f))
+            _cache_put(model, prompt, steps, persist=False)
+            return steps
+    return None
+
+
+def _cache_put(model: str, prompt: str, steps: tuple[str, ...], persist: bool = True) -> None:
+    # An empty plan is never useful, so don't let one stick for later runs
+    if not steps:
+        return
+    _plan_cache[(model, prompt)] = steps
+    if len(_plan_cache) > PLAN_CACHE_SIZE:
+        _plan_cache.popitem(last=False)
+    if persist and PLAN_CACHE_DIR:
+        os.makedirs(PLAN_CACHE_DIR, exist_ok=True)
+        with open(_plan_cache_path(model, prompt), "w", encoding="utf-8") as f:
+            json.dump(list(steps), f)
+
+
+def plan_task(user_goal: str, model: Optional[str] = None):
+    model_llm = _get_llm(model)
+    prompt = _build_prompt(user_goal)
+    steps = _cache_get(model_llm.model_name, prompt)
+    if steps is None:
+        response = model_llm.invoke(_messages(prompt))
+        steps = tuple(_parse_steps(response.content))
+        _cache_put(model_llm.model_name, prompt, steps)
+    # Hand back a fresh list so callers can't mutate the cached plan
+    return list(steps)
+
+
+def stream_plan_task(user_goal: str, model: Optional[str] = None):
+    """Yield plan steps one at a time, as soon as each step has been generated."""
+    model_llm = _get_llm(model)
+    prompt = _build_prompt(user_goal)
+    cached = _cache_get(model_llm.model_name, prompt)
+    if cached is not None:
+        yield from cached
+        return
+
+    steps = []
+    chunks = (chunk.content for chunk in model_llm.stream(_messages(prompt)))
+    for step in _iter_streamed_steps(chunks):
+        steps.append(step)
+        yield step
+
+    _cache_put(model_llm.model_name, prompt, tuple(steps))
+
+
+async def aplan_task(user_goal: str, semaphore: Optional[asyncio.Semaphore] = None,
+                     model: Optional[str] = None):
+    """Async variant of plan_task; network waits overlap with other requests."""
+    model_llm = _get_llm(model)
+    prompt = _build_prompt(user_goal)
+    steps = _cache_get(model_llm.model_name, prompt)
+    if steps is None:
+        semaphore = semaphore or asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        async with semaphore:
+            response = await model_llm.ainvoke(_messages(prompt))
+        steps = tuple(_parse_steps(response.content))
+        _cache_put(model_llm.model_name, prompt, steps)
+    return list(steps)
+
+
+async def aplan_many(goals: list[str], model: Optional[str] = None) -> list[list[str]]:
+    """Plan several goals concurrently, returning step lists in input order."""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    return await asyncio.gather(*[aplan_task(goal, semaphore, model) for goal in goals])
+
+
+def plan_tasks(goals: list[str]) -> list[list[str]]:
+    """Plan several goals with a single request, returning step lists in input order."""
+    # Each goal's plan is cached under its single-goal prompt, so batched and
+    # per-goal planning share entries and only uncached goals are sent
+    prompts = [_build_prompt(goal) for goal in goals]
+    plans = [_cache_get(llm.model_name, prompt) for prompt in prompts]
+    pending = [idx for idx, steps in enumerate(plans) if steps is None]
+    if not pending:
+        return [list(steps) for steps in plans]
 
-Format your answer as a numbered list of short steps.
+    response = llm.invoke(_messages(_build_batch_prompt([goals[idx] for idx in pending])))
+    try:
+        planned = {int(entry["id"]): entry["steps"] for entry in json.loads(response.content)["goals"]}
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Malformed batch plan reply: {e!r}") from e
+    missing = [idx + 1 for num, idx in enumerate(pending, 1) if not planned.get(num)]
+    if missing:
+        raise ValueError(f"Batch plan reply has no steps for goal(s) {missing}")
 
-Goal: {user_goal}
-"""
-    response = llm.invoke([HumanMessage(content=prompt)])
-    return response.content.splitlines()
+    for num, idx in enumerate(pending, 1):
+        plans[idx] = tuple(_check_steps(planned[num]))
+        _cache_put(llm.model_name, prompts[idx], plans[idx])
+    return [list(steps) for steps in plans]
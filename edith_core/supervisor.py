@@ -1,26 +1,64 @@
 # supervisor.py
 
-from edith_core.planner import plan_task
+from typing import Optional
+
+from edith_core.planner import (
+    FALLBACK_MODEL,
+    PLANNER_MODEL,
+    plan_task,
+    plan_tasks,
+    stream_plan_task,
+)
 from edith_core.executor import execute_steps
 from edith_core.verifier import verify_results
 
 
-def run_task(goal: str):
-    print(f"\n🎯 [Supervisor] New Task: {goal}")
+def _collect(stream, into: list):
+    """Pass items through from stream while recording them in into."""
+    for item in stream:
+        into.append(item)
+        yield item
+
+
+def _print_plan(steps: list[str]):
+    # One print for the whole plan instead of one per step
+    lines = [f"{idx}. {step}" for idx, step in enumerate(steps, 1)]
+    print("\n[Planner Output]\n" + "\n".join(lines))
+
 
-    # Step 1: Plan
-    steps = plan_task(goal)
-    print("\n[Planner Output]")
-    for idx, step in enumerate(steps, 1):
-        print(f"{idx}. {step}")
+def run_task(goal: str, steps: Optional[list[str]] = None, delay: Optional[float] = None):
+    print(f"\n🎯 [Supervisor] New Task: {goal}")
 
-    # Step 2: Execute
-    results = execute_steps(steps)
+    # Step 1 + 2: Plan and execute. Unless the caller already planned this
+    # goal, steps are streamed from the planner into the executor so that
+    # execution starts while the rest of the plan is still being generated
+    planned_here = steps is None
+    if planned_here:
+        steps = []
+        step_source = _collect(stream_plan_task(goal), steps)
+    else:
+        step_source = steps
+    results = execute_steps(step_source, delay)
+    if planned_here:
+        # Finish the streamed plan even if the executor stopped reading it early
+        for _ in step_source:
+            pass
+    _print_plan(steps)
     print("\n[Executor] Execution complete.\n")
 
     # Step 3: Verify
     matched_keywords, success = verify_results(goal, results)
 
+    # Escalate to the larger planner model only when the default one's plan
+    # was rejected; this also covers steps pre-planned with plan_tasks
+    if not success and FALLBACK_MODEL != PLANNER_MODEL:
+        print(f"\n🔁 [Supervisor] Re-planning with {FALLBACK_MODEL}...")
+        steps = plan_task(goal, model=FALLBACK_MODEL)
+        results = execute_steps(steps, delay)
+        _print_plan(steps)
+        print("\n[Executor] Execution complete.\n")
+        matched_keywords, success = verify_results(goal, results)
+
     # Step 4: Final decision
     if success:
         supervisor_result = "✅ [Supervisor] Task completed successfully!"
@@ -37,3 +75,9 @@ def run_task(goal: str):
         "verifier_keywords": matched_keywords,
         "supervisor_result": supervisor_result
     }
+
+
+def run_tasks(goals: list[str]):
+    """Run several tasks, planning all of them with one batched planner request."""
+    plans = plan_tasks(goals)
+    return [run_task(goal, steps) for goal, steps in zip(goals, plans)]
@@ -4,7 +4,10 @@ def verify_results(goal: str, executor_results: list[str]) -> tuple[list[str], b
     print("\n[Verifier] Verifying task outcome...")
 
     expected_keywords = goal.lower().split()
-    matched_keywords = [kw for kw in expected_keywords if any(kw in step.lower() for step in executor_results)]
+    # Lowercase all results once and search the joined text, instead of
+    # re-lowercasing every step for every keyword
+    results_text = "\n".join(executor_results).lower()
+    matched_keywords = [kw for kw in expected_keywords if kw in results_text]
 
     print(f"\nMatched keywords: {matched_keywords}")
 
@@ -50,15 +50,12 @@ def main():
         print(f"🎯 Final Result: {result['supervisor_result']}")
         print(f"⏱️ Execution Time: {execution_time:.2f} seconds")
         
-        # Show planned steps
-        print("\n📝 Planned Steps:")
-        for i, step in enumerate(result['planner_steps'], 1):
-            print(f"  {i}. {step}")
-        
-        # Show execution results
-        print("\n⚡ Execution Results:")
-        for i, result_step in enumerate(result['executor_results'], 1):
-            print(f"  {i}. {result_step}")
+        # Show planned steps and execution results in a single write
+        lines = ["\n📝 Planned Steps:"]
+        lines += [f"  {i}. {step}" for i, step in enumerate(result['planner_steps'], 1)]
+        lines.append("\n⚡ Execution Results:")
+        lines += [f"  {i}. {result_step}" for i, result_step in enumerate(result['executor_results'], 1)]
+        print("\n".join(lines))
         
         # Success analysis
         success = "✅" in result['supervisor_result']
@@ -8,62 +8,56 @@ the full capabilities of EDITH-QA.
 
 import os
 import sys
+import io
 import time
-import subprocess
+import importlib
+import traceback
+from contextlib import redirect_stdout, redirect_stderr
 from datetime import datetime
 from typing import List, Dict
 
-def run_example(script_path: str, description: str) -> Dict:
-    """Run a single example script and capture results."""
+# Add parent directory to path so examples can be imported as modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def run_example(script_path: str, module_name: str, description: str) -> Dict:
+    """Run a single example in-process and capture results.
+    
+    Examples are imported and their ``main()`` called directly rather than
+    spawned as subprocesses, so heavy imports (langchain, OpenCV) and the
+    planner's client and cache are paid for once and shared across examples.
+    A falsy return value from ``main()`` counts as a failure, mirroring the
+    non-zero exit code the script would produce.
+    """
     
     print(f"\n🚀 Running: {description}")
     print(f"📁 Script: {script_path}")
     print("-" * 50)
     
     start_time = time.time()
+    stdout, stderr = io.StringIO(), io.StringIO()
     
     try:
-        # Run the script
-        result = subprocess.run(
-            [sys.executable, script_path],
-            capture_output=True,
-            text=True,
-            timeout=300  # 5 minute timeout
-        )
-        
-        end_time = time.time()
-        duration = end_time - start_time
-        
-        return {
-            "script": script_path,
-            "description": description,
-            "success": result.returncode == 0,
-            "duration": duration,
-            "stdout": result.stdout,
-            "stderr": result.stderr,
-            "returncode": result.returncode
-        }
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            module = importlib.import_module(module_name)
+            result = module.main()
+        returncode = 0 if result else 1
         
-    except subprocess.TimeoutExpired:
-        return {
-            "script": script_path,
-            "description": description,
-            "success": False,
-            "duration": 300,
-            "stdout": "",
-            "stderr": "Script timed out after 5 minutes",
-            "returncode": -1
-        }
-    except Exception as e:
-        return {
-            "script": script_path,
-            "description": description,
-            "success": False,
-            "duration": 0,
-            "stdout": "",
-            "stderr": str(e),
-            "returncode": -1
-        }
+    except SystemExit as e:
+        # sys.exit() / sys.exit(None) is a clean exit, as it is for the script
+        returncode = 0 if e.code is None else (e.code if isinstance(e.code, int) else 1)
+    except Exception:
+        stderr.write(traceback.format_exc())
+        returncode = -1
+    
+    return {
+        "script": script_path,
+        "description": description,
+        "success": returncode == 0,
+        "duration": time.time() - start_time,
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+        "returncode": returncode
+    }
 
 def display_results(results: List[Dict]):
     """Display comprehensive results from all examples."""
@@ -126,10 +120,12 @@ def main():
     examples = [
         {
             "script": "examples/basic_usage.py",
+            "module": "examples.basic_usage",
             "description": "Basic Usage - Simple task execution"
         },
         {
             "script": "examples/advanced_testing.py", 
+            "module": "examples.advanced_testing",
             "description": "Advanced Testing - Complex workflows and analysis"
         }
     ]
@@ -151,7 +147,7 @@ def main():
     # Run all examples
     results = []
     for example in existing_examples:
-        result = run_example(example['script'], example['description'])
+        result = run_example(example['script'], example['module'], example['description'])
         results.append(result)
         
         # Brief pause between examples
@@ -1,7 +1,7 @@
 # run.py
 
 from edith_core import supervisor
-import json
+import orjson
 from datetime import datetime
 import os
 
@@ -18,7 +18,7 @@ if __name__ == "__main__":
     }
 
     os.makedirs("logs", exist_ok=True)
-    with open("logs/airplane_mode.json", "w") as f:
-        json.dump(log_data, f, indent=2)
+    with open("logs/airplane_mode.json", "wb") as f:
+        f.write(orjson.dumps(log_data, option=orjson.OPT_INDENT_2))
 
     print("📄 QA log saved to logs/airplane_mode.json")
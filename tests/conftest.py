@@ -6,14 +6,20 @@ This module provides pytest configuration and shared fixtures for all tests.
 
 import pytest
 import os
-import tempfile
+import io
+import sys
+import functools
 import json
-from unittest.mock import Mock, patch
-from datetime import datetime
-from typing import Dict, List, Any
+from types import MappingProxyType
+from unittest.mock import AsyncMock, Mock, patch
 
-# Test configuration
-pytest_plugins = ["pytest_cov"]
+# NumPy/PIL are only needed for mock_screenshot; resolve them once at
+# collection time, without breaking collection where they aren't installed
+try:
+    import numpy as np
+    from PIL import Image
+except ImportError:  # pragma: no cover - depends on the environment
+    np = Image = None
 
 
 @pytest.fixture(scope="session")
@@ -28,157 +34,206 @@ def test_config():
     }
 
 
+# Canned API responses; constant, so built once rather than inside the fixtures
+_ANTHROPIC_MOCK_RESPONSE = {
+    'content': [{
+        'text': 'Mocked Agent-S2 response'
+    }]
+}
+
+
+def _mock_plan_reply(messages):
+    """Canned planner reply: a fixed four-step plan whose last step echoes the goal."""
+    goal = messages[-1].content.split("Goal: ", 1)[-1]
+    steps = [
+        "1. Open Settings app",
+        "2. Navigate to Network & Wi-Fi settings",
+        "3. Enable Airplane Mode",
+        f"4. Verify the settings reflect the goal: {goal}",
+    ]
+    return Mock(content=json.dumps({"steps": steps}))
+
+
+def _mock_plan_stream(messages):
+    content = _mock_plan_reply(messages).content
+    # Small chunks, so steps arrive split across chunks like a real stream
+    return iter([Mock(content=content[i:i + 16]) for i in range(0, len(content), 16)])
+
+
+def _reset_chat_model(fake):
+    """(Re)install the canned behaviour on the fake planner model."""
+    fake.reset_mock()
+    fake.invoke.side_effect = _mock_plan_reply
+    fake.ainvoke.side_effect = _mock_plan_reply
+    fake.stream.side_effect = _mock_plan_stream
+
+
+@pytest.fixture(scope="session")
+def _shared_openai_mock():
+    """Single fake planner model (ChatOpenAI stand-in), installed once for the whole session.
+    
+    Patched where the planner looks its model up, so no test reaches the API.
+    """
+    from edith_core import planner
+    
+    fake = Mock(model_name="mock-planner", ainvoke=AsyncMock())
+    _reset_chat_model(fake)
+    
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(planner, '_get_llm', lambda model=None: fake)
+        mp.setattr(planner, 'llm', fake)
+        yield fake
+
+
 @pytest.fixture
-def mock_openai_api():
-    """Mock OpenAI API responses for testing."""
-    mock_response = {
-        'choices': [{
-            'message': {
-                'content': '1. Open Settings app\n2. Navigate to Network settings\n3. Enable Airplane Mode\n4. Verify status'
-            }
-        }]
-    }
+def mock_openai_api(_shared_openai_mock):
+    """Mock OpenAI API responses for testing.
     
-    with patch('openai.ChatCompletion.create') as mock:
-        mock.return_value = mock_response
-        yield mock
+    Yields the fake planner model; tests may override ``side_effect`` on its
+    ``invoke``/``stream``, and the overrides and recorded calls are reset
+    afterwards instead of re-patching per test.
+    """
+    yield _shared_openai_mock
+    _reset_chat_model(_shared_openai_mock)
 
 
 @pytest.fixture
 def mock_anthropic_api():
     """Mock Anthropic API responses for testing."""
-    mock_response = {
-        'content': [{
-            'text': 'Mocked Agent-S2 response'
-        }]
-    }
+    # Resolved here rather than at import, so only tests using this fixture
+    # pay for the anthropic import. Clients reach create() through a
+    # per-instance Messages resource, which older SDKs don't have.
+    try:
+        from anthropic.resources import Messages
+    except ImportError:
+        pytest.skip("anthropic SDK without the Messages API")
     
-    with patch('anthropic.Anthropic.messages.create') as mock:
-        mock.return_value = mock_response
+    with patch.object(Messages, 'create') as mock:
+        mock.return_value = _ANTHROPIC_MOCK_RESPONSE
         yield mock
 
 
-@pytest.fixture
-def temp_log_dir():
-    """Create temporary directory for test logs."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        yield tmpdir
+@pytest.fixture(autouse=True)
+def _isolate_plan_cache(monkeypatch):
+    """Start every test with an empty, memory-only planner cache."""
+    # Only touch the planner if a test has imported it; importing it here
+    # would require OPENAI_API_KEY for every test
+    planner = sys.modules.get('edith_core.planner')
+    if planner is None:
+        yield
+        return
+    monkeypatch.setattr(planner, 'PLAN_CACHE_DIR', None)
+    planner._plan_cache.clear()
+    yield
+    planner._plan_cache.clear()
 
 
-@pytest.fixture
-def temp_image_dir():
-    """Create temporary directory for test images."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        yield tmpdir
+# Also imported directly by tests that parametrize over the goals
+SAMPLE_GOALS = (
+    "Enable Airplane Mode from Settings",
+    "Turn off Wi-Fi via Settings",
+    "Open Calculator app",
+    "Set alarm for 7:00 AM",
+    "Add new contact",
+)
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_goals():
-    """Sample task goals for testing."""
-    return [
-        "Enable Airplane Mode from Settings",
-        "Turn off Wi-Fi via Settings",
-        "Open Calculator app",
-        "Set alarm for 7:00 AM",
-        "Add new contact"
-    ]
+    """Sample task goals for testing (an immutable tuple; copy before mutating)."""
+    return SAMPLE_GOALS
+
+
+# Frozen sample data, built once at import time. The sample_* fixtures hand
+# out references to these read-only objects instead of rebuilding literals.
+PLANNER_STEPS = (
+    "1. Unlock the Android device if it's locked.",
+    "2. Locate and tap on the 'Apps' icon on the home screen.",
+    "3. Scroll through the apps and find the 'Settings' app.",
+    "4. Tap on the 'Settings' app to open it.",
+    "5. Scroll down the settings menu and find the 'Network & Internet' option.",
+    "6. Tap on the 'Network & Internet' option to open it.",
+    "7. Find and tap on the 'Airplane Mode' option.",
+    "8. Toggle the switch to the 'On' position to enable Airplane Mode.",
+    "9. Verify that Airplane Mode is enabled by checking the status bar.",
+)
+
+# Derived from PLANNER_STEPS in the executor's result format, so the step
+# text is written (and stored) once
+EXECUTOR_RESULTS = tuple(f"{step} — SUCCESS" for step in PLANNER_STEPS)
+
+SAMPLE_TASK_PROMPT = "Enable Airplane Mode from Settings"
+MATCHED_KEYWORDS = ("enable", "airplane", "mode", "settings")
+
+_SAMPLE_DATA = MappingProxyType({
+    "planning": MappingProxyType({
+        "task_prompt": SAMPLE_TASK_PROMPT,
+        "planner_steps": PLANNER_STEPS,
+    }),
+    "execution": EXECUTOR_RESULTS,
+    "verification": MappingProxyType({
+        "matched_keywords": MATCHED_KEYWORDS,
+        "success": True,
+    }),
+    "complete": MappingProxyType({
+        # Fixed timestamp; no test asserts on its value
+        "timestamp": "2025-01-01T00:00:00",
+        "task_prompt": SAMPLE_TASK_PROMPT,
+        "planner_steps": PLANNER_STEPS,
+        "executor_results": EXECUTOR_RESULTS,
+        "verifier_keywords": MATCHED_KEYWORDS,
+        "supervisor_result": "✅ [Supervisor] Task completed successfully!",
+    }),
+})
+
+
+@pytest.fixture(scope="session")
+def _sample_data():
+    """Read-only sample results shared by the sample_* fixtures."""
+    return _SAMPLE_DATA
 
 
 @pytest.fixture
-def sample_planning_result():
+def sample_planning_result(_sample_data):
     """Sample planning result for testing."""
-    return {
-        "task_prompt": "Enable Airplane Mode from Settings",
-        "planner_steps": [
-            "1. Unlock the Android device if it's locked.",
-            "2. Locate and tap on the 'Apps' icon on the home screen.",
-            "3. Scroll through the apps and find the 'Settings' app.",
-            "4. Tap on the 'Settings' app to open it.",
-            "5. Scroll down the settings menu and find the 'Network & Internet' option.",
-            "6. Tap on the 'Network & Internet' option to open it.",
-            "7. Find and tap on the 'Airplane Mode' option.",
-            "8. Toggle the switch to the 'On' position to enable Airplane Mode.",
-            "9. Verify that Airplane Mode is enabled by checking the status bar."
-        ]
-    }
+    return _sample_data["planning"]
 
 
 @pytest.fixture
-def sample_execution_result():
+def sample_execution_result(_sample_data):
     """Sample execution result for testing."""
-    return [
-        "1. Unlock the Android device if it's locked. — SUCCESS",
-        "2. Locate and tap on the 'Apps' icon on the home screen. — SUCCESS",
-        "3. Scroll through the apps and find the 'Settings' app. — SUCCESS",
-        "4. Tap on the 'Settings' app to open it. — SUCCESS",
-        "5. Scroll down the settings menu and find the 'Network & Internet' option. — SUCCESS",
-        "6. Tap on the 'Network & Internet' option to open it. — SUCCESS",
-        "7. Find and tap on the 'Airplane Mode' option. — SUCCESS",
-        "8. Toggle the switch to the 'On' position to enable Airplane Mode. — SUCCESS",
-        "9. Verify that Airplane Mode is enabled by checking the status bar. — SUCCESS"
-    ]
+    return _sample_data["execution"]
 
 
 @pytest.fixture
-def sample_verification_result():
+def sample_verification_result(_sample_data):
     """Sample verification result for testing."""
-    return {
-        "matched_keywords": ["enable", "airplane", "mode", "settings"],
-        "success": True
-    }
+    return _sample_data["verification"]
 
 
 @pytest.fixture
-def sample_complete_result():
+def sample_complete_result(_sample_data):
     """Sample complete test result for testing."""
-    return {
-        "timestamp": datetime.now().isoformat(),
-        "task_prompt": "Enable Airplane Mode from Settings",
-        "planner_steps": [
-            "1. Unlock the Android device if it's locked.",
-            "2. Locate and tap on the 'Apps' icon on the home screen.",
-            "3. Scroll through the apps and find the 'Settings' app.",
-            "4. Tap on the 'Settings' app to open it.",
-            "5. Scroll down the settings menu and find the 'Network & Internet' option.",
-            "6. Tap on the 'Network & Internet' option to open it.",
-            "7. Find and tap on the 'Airplane Mode' option.",
-            "8. Toggle the switch to the 'On' position to enable Airplane Mode.",
-            "9. Verify that Airplane Mode is enabled by checking the status bar."
-        ],
-        "executor_results": [
-            "1. Unlock the Android device if it's locked. — SUCCESS",
-            "2. Locate and tap on the 'Apps' icon on the home screen. — SUCCESS",
-            "3. Scroll through the apps and find the 'Settings' app. — SUCCESS",
-            "4. Tap on the 'Settings' app to open it. — SUCCESS",
-            "5. Scroll down the settings menu and find the 'Network & Internet' option. — SUCCESS",
-            "6. Tap on the 'Network & Internet' option to open it. — SUCCESS",
-            "7. Find and tap on the 'Airplane Mode' option. — SUCCESS",
-            "8. Toggle the switch to the 'On' position to enable Airplane Mode. — SUCCESS",
-            "9. Verify that Airplane Mode is enabled by checking the status bar. — SUCCESS"
-        ],
-        "verifier_keywords": ["enable", "airplane", "mode", "settings"],
-        "supervisor_result": "✅ [Supervisor] Task completed successfully!"
-    }
+    return _sample_data["complete"]
 
 
-@pytest.fixture
-def mock_screenshot():
-    """Mock screenshot data for testing."""
-    # Create a simple mock image data
-    import numpy as np
-    from PIL import Image
-    
-    # Create a simple test image
-    img_array = np.ones((100, 100, 3), dtype=np.uint8) * 128  # Gray image
-    img = Image.fromarray(img_array)
-    
-    # Convert to bytes
-    import io
+@functools.lru_cache(maxsize=None)
+def _gray_png(size: int = 100) -> bytes:
+    """Encode a uniform gray ``size`` x ``size`` PNG (computed once per size)."""
+    img_array = np.full((size, size, 3), 128, dtype=np.uint8)
     buffered = io.BytesIO()
-    img.save(buffered, format="PNG")
+    Image.fromarray(img_array).save(buffered, format="PNG")
     return buffered.getvalue()
 
 
+@pytest.fixture(scope="session")
+def mock_screenshot():
+    """Mock screenshot data for testing (PNG bytes, encoded once per session)."""
+    if np is None or Image is None:
+        pytest.skip("numpy and Pillow are required for mock_screenshot")
+    return _gray_png()
+
+
 @pytest.fixture
 def mock_android_env():
     """Mock Android environment for testing."""
@@ -204,41 +259,44 @@ def mock_agent_s2():
     return mock_agent
 
 
-@pytest.fixture(autouse=True)
-def setup_test_environment():
-    """Set up test environment before each test."""
-    # Set test environment variables
-    os.environ['EDITH_TEST_MODE'] = 'true'
-    os.environ['LOG_LEVEL'] = 'DEBUG'
-    
-    # Create test directories
-    os.makedirs('test_logs', exist_ok=True)
-    os.makedirs('test_images', exist_ok=True)
-    
-    yield
+@pytest.fixture(scope="session")
+def output_dirs(tmp_path_factory):
+    """Log/image output directories for tests that write files.
     
-    # Cleanup after test
-    import shutil
-    if os.path.exists('test_logs'):
-        shutil.rmtree('test_logs')
-    if os.path.exists('test_images'):
-        shutil.rmtree('test_images')
+    Opt-in and session-scoped: the directories live under pytest's base temp
+    dir, which pytest cleans up in bulk, so tests that never touch the
+    filesystem pay nothing.
+    """
+    return {
+        "logs": tmp_path_factory.mktemp("test_logs", numbered=False),
+        "images": tmp_path_factory.mktemp("test_images", numbered=False),
+    }
 
 
-@pytest.fixture
+PERFORMANCE_BENCHMARK = MappingProxyType({
+    "max_execution_time": 30.0,
+    "max_planning_time": 5.0,
+    "max_verification_time": 1.0,
+    "min_success_rate": 0.8
+})
+
+
+@pytest.fixture(scope="session")
 def performance_benchmark():
-    """Performance benchmark data for testing."""
-    return {
-        "max_execution_time": 30.0,
-        "max_planning_time": 5.0,
-        "max_verification_time": 1.0,
-        "min_success_rate": 0.8
-    }
+    """Performance benchmark data for testing (read-only)."""
+    return PERFORMANCE_BENCHMARK
 
 
 # Test markers
 def pytest_configure(config):
-    """Configure pytest with custom markers."""
+    """Configure the test environment and custom markers."""
+    # Test environment variables (set once per session)
+    os.environ['EDITH_TEST_MODE'] = 'true'
+    os.environ['LOG_LEVEL'] = 'DEBUG'
+    os.environ['EDITH_STEP_DELAY'] = '0'
+    # The planner refuses to import without a key; tests only use the fake model
+    os.environ.setdefault('OPENAI_API_KEY', 'test-key')
+    
     config.addinivalue_line(
         "markers", "slow: marks tests as slow (deselect with '-m \"not slow\"')"
     )
@@ -254,16 +312,23 @@ def pytest_configure(config):
 
 
 # Test collection hooks
+# Marker for tests collected under each test directory, checked in this order
+_DIRECTORY_MARKERS = (
+    ("integration", pytest.mark.integration),
+    ("unit", pytest.mark.unit),
+    ("performance", pytest.mark.performance),
+)
+
+
 def pytest_collection_modifyitems(config, items):
     """Modify test collection to add markers based on test location."""
     for item in items:
-        # Add markers based on test file location
-        if "integration" in str(item.fspath):
-            item.add_marker(pytest.mark.integration)
-        elif "unit" in str(item.fspath):
-            item.add_marker(pytest.mark.unit)
-        elif "performance" in str(item.fspath):
-            item.add_marker(pytest.mark.performance)
+        # Add markers based on the directories in the test file's path
+        path_parts = frozenset(item.path.parts)
+        for directory, marker in _DIRECTORY_MARKERS:
+            if directory in path_parts:
+                item.add_marker(marker)
+                break
         
         # Add slow marker for tests that take longer
         if "slow" in item.name or "benchmark" in item.name:
@@ -0,0 +1,86 @@
+"""
+Unit tests for EDITH-QA Executor agent.
+
+Tests step execution on the worker pool, with mock rendering disabled.
+"""
+
+import pytest
+import threading
+import time
+
+from edith_core import executor
+from edith_core.executor import execute_steps
+
+
+STEPS = ["1. Open Settings", "2. Navigate to Network", "3. Enable Airplane Mode"]
+
+
+@pytest.fixture(autouse=True)
+def _no_render(monkeypatch):
+    """Skip mock screenshots (and the cv2 import) for every executor test."""
+    monkeypatch.setenv("EDITH_MOCK_RENDER", "0")
+
+
+class TestExecutor:
+    """Test cases for Executor agent."""
+
+    def test_execute_steps_basic(self):
+        """Test that every step is executed and reported as successful."""
+        results = execute_steps(STEPS)
+
+        assert results == [f"{step} — SUCCESS" for step in STEPS]
+
+    def test_execute_steps_keeps_input_order(self, monkeypatch):
+        """Test that results follow step order even when later steps finish first."""
+        finished = []
+        lock = threading.Lock()
+
+        def stub_run_step(idx, step, delay, render):
+            # Earlier steps sleep longer, so they complete last
+            time.sleep((len(STEPS) - idx + 1) * 0.05)
+            with lock:
+                finished.append(idx)
+            return f"{step} — DONE"
+
+        monkeypatch.setattr(executor, '_run_step', stub_run_step)
+
+        results = execute_steps(STEPS)
+
+        assert finished == [3, 2, 1]
+        assert results == [f"{step} — DONE" for step in STEPS]
+
+    def test_execute_steps_accepts_generator(self):
+        """Test that a streamed plan (a generator) is executed like a list."""
+        results = execute_steps(step for step in STEPS)
+
+        assert results == [f"{step} — SUCCESS" for step in STEPS]
+
+    def test_execute_steps_empty(self):
+        """Test that an empty plan produces no results."""
+        assert execute_steps([]) == []
+
+    def test_execute_steps_delay(self, monkeypatch):
+        """Test that EDITH_STEP_DELAY is the default delay and an explicit delay overrides it."""
+        delays = []
+        monkeypatch.setattr(
+            executor, '_run_step',
+            lambda idx, step, delay, render: delays.append(delay) or step
+        )
+        monkeypatch.setenv("EDITH_STEP_DELAY", "0.25")
+
+        execute_steps(STEPS[:1])
+        execute_steps(STEPS[:1], delay=0)
+
+        assert delays == [0.25, 0]
+
+    def test_execute_steps_without_render(self, monkeypatch, tmp_path):
+        """Test that EDITH_MOCK_RENDER=0 skips cv2 and the images directory."""
+        def fail_load():
+            raise AssertionError("cv2 loaded with rendering disabled")
+
+        monkeypatch.setattr(executor, '_load_cv', fail_load)
+        monkeypatch.chdir(tmp_path)
+
+        execute_steps(STEPS)
+
+        assert not (tmp_path / "images").exists()
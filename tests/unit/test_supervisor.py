@@ -5,14 +5,28 @@ Tests the core orchestration functionality of the Supervisor agent.
 """
 
 import pytest
-import json
-import os
-from unittest.mock import patch, Mock
-from datetime import datetime
+import builtins
+from unittest.mock import MagicMock, patch
 
+from conftest import SAMPLE_GOALS
+from edith_core import supervisor
 from edith_core.supervisor import run_task
 
 
+KEYWORD_CASES = [
+    ("Enable Airplane Mode", ["enable", "airplane", "mode"]),
+    ("Turn off Wi-Fi", ["turn", "off", "wi-fi"]),
+    ("Open Calculator", ["open", "calculator"]),
+    ("Set alarm for 7:00 AM", ["set", "alarm", "7:00", "am"]),
+]
+
+
+@pytest.fixture(scope="session")
+def precomputed_results(_shared_openai_mock):
+    """run_task results for the keyword cases, computed once per goal per session."""
+    return {goal: run_task(goal) for goal, _ in KEYWORD_CASES}
+
+
 class TestSupervisor:
     """Test cases for Supervisor agent."""
     
@@ -43,109 +57,140 @@ class TestSupervisor:
         assert len(result['verifier_keywords']) > 0
         assert isinstance(result['supervisor_result'], str)
     
-    def test_run_task_with_different_goals(self, sample_goals, mock_openai_api):
+    @pytest.mark.parametrize("goal", SAMPLE_GOALS)
+    def test_run_task_with_different_goals(self, goal, mock_openai_api):
         """Test task execution with different goals."""
-        for goal in sample_goals:
-            # Act
-            result = run_task(goal)
-            
-            # Assert
-            assert result is not None
-            assert result['task_prompt'] == goal
-            assert len(result['planner_steps']) > 0
-            assert len(result['executor_results']) > 0
+        # Act
+        result = run_task(goal)
+        
+        # Assert
+        assert result is not None
+        assert result['task_prompt'] == goal
+        assert len(result['planner_steps']) > 0
+        assert len(result['executor_results']) > 0
     
-    def test_run_task_planning_phase(self, sample_goals, mock_openai_api):
+    def test_run_task_planning_phase(self, sample_goals, mock_openai_api, monkeypatch):
         """Test the planning phase of task execution."""
         goal = sample_goals[0]
         
-        with patch('edith_core.planner.plan_task') as mock_plan:
-            mock_plan.return_value = [
-                "1. Open Settings",
-                "2. Navigate to Network",
-                "3. Enable Airplane Mode"
-            ]
-            
-            result = run_task(goal)
-            
-            # Verify planning was called
-            mock_plan.assert_called_once_with(goal)
-            assert len(result['planner_steps']) == 3
+        # Patched on the module supervisor looks it up in; reverted on teardown
+        mock_plan = MagicMock(return_value=[
+            "1. Open Settings",
+            "2. Navigate to Network",
+            "3. Enable Airplane Mode"
+        ])
+        monkeypatch.setattr(supervisor, 'stream_plan_task', mock_plan)
+        
+        result = run_task(goal)
+        
+        # Verify planning was called
+        mock_plan.assert_called_once_with(goal)
+        assert len(result['planner_steps']) == 3
     
-    def test_run_task_execution_phase(self, sample_goals, mock_openai_api):
+    def test_run_task_execution_phase(self, sample_goals, mock_openai_api, monkeypatch):
         """Test the execution phase of task execution."""
         goal = sample_goals[0]
         
-        with patch('edith_core.executor.execute_steps') as mock_exec:
-            mock_exec.return_value = [
-                "Step 1 — SUCCESS",
-                "Step 2 — SUCCESS",
-                "Step 3 — SUCCESS"
-            ]
-            
-            result = run_task(goal)
-            
-            # Verify execution was called
-            mock_exec.assert_called_once()
-            assert len(result['executor_results']) == 3
+        planned_steps = ["1. Open Settings", "2. Navigate to Network", "3. Enable Airplane Mode"]
+        monkeypatch.setattr(supervisor, 'stream_plan_task', lambda goal: iter(planned_steps))
+        # The canned results match none of the goal's keywords; keep the
+        # rejected run from escalating to the fallback planner
+        monkeypatch.setattr(supervisor, 'FALLBACK_MODEL', supervisor.PLANNER_MODEL)
+        
+        mock_exec = MagicMock(return_value=[
+            "Step 1 — SUCCESS",
+            "Step 2 — SUCCESS",
+            "Step 3 — SUCCESS"
+        ])
+        monkeypatch.setattr(supervisor, 'execute_steps', mock_exec)
+        
+        result = run_task(goal)
+        
+        # Verify execution was called
+        mock_exec.assert_called_once()
+        assert len(result['executor_results']) == 3
+        # The full plan is recorded even though the mock never read the stream
+        assert result['planner_steps'] == planned_steps
     
-    def test_run_task_verification_phase(self, sample_goals, mock_openai_api):
+    def test_run_task_verification_phase(self, sample_goals, mock_openai_api, monkeypatch):
         """Test the verification phase of task execution."""
         goal = sample_goals[0]
         
-        with patch('edith_core.verifier.verify_results') as mock_verify:
-            mock_verify.return_value = (["enable", "airplane", "mode"], True)
-            
-            result = run_task(goal)
-            
-            # Verify verification was called
-            mock_verify.assert_called_once()
-            assert result['verifier_keywords'] == ["enable", "airplane", "mode"]
+        mock_verify = MagicMock(return_value=(["enable", "airplane", "mode"], True))
+        monkeypatch.setattr(supervisor, 'verify_results', mock_verify)
+        
+        result = run_task(goal)
+        
+        # Verify verification was called
+        mock_verify.assert_called_once()
+        assert result['verifier_keywords'] == ["enable", "airplane", "mode"]
     
-    def test_run_task_success_result(self, sample_goals, mock_openai_api):
+    def test_run_task_success_result(self, sample_goals, mock_openai_api, monkeypatch):
         """Test successful task result formatting."""
         goal = sample_goals[0]
         
-        with patch('edith_core.verifier.verify_results') as mock_verify:
-            mock_verify.return_value = (["enable", "airplane", "mode"], True)
-            
-            result = run_task(goal)
-            
-            assert "✅" in result['supervisor_result']
-            assert "successfully" in result['supervisor_result'].lower()
+        monkeypatch.setattr(
+            supervisor, 'verify_results',
+            lambda goal, results: (["enable", "airplane", "mode"], True)
+        )
+        
+        result = run_task(goal)
+        
+        assert "✅" in result['supervisor_result']
+        assert "successfully" in result['supervisor_result'].lower()
     
-    def test_run_task_failure_result(self, sample_goals, mock_openai_api):
+    def test_run_task_failure_result(self, sample_goals, mock_openai_api, monkeypatch):
         """Test failed task result formatting."""
         goal = sample_goals[0]
         
-        with patch('edith_core.verifier.verify_results') as mock_verify:
-            mock_verify.return_value = (["enable"], False)
-            
-            result = run_task(goal)
-            
-            assert "❌" in result['supervisor_result']
-            assert "failed" in result['supervisor_result'].lower()
+        monkeypatch.setattr(
+            supervisor, 'verify_results',
+            lambda goal, results: (["enable"], False)
+        )
+        monkeypatch.setattr(supervisor, 'FALLBACK_MODEL', supervisor.PLANNER_MODEL)
+        
+        result = run_task(goal)
+        
+        assert "❌" in result['supervisor_result']
+        assert "failed" in result['supervisor_result'].lower()
+    
+    def test_run_task_escalates_preplanned_steps(self, monkeypatch):
+        """Test that a rejected pre-planned run (e.g. from plan_tasks) re-plans with the fallback model."""
+        monkeypatch.setattr(supervisor, 'PLANNER_MODEL', 'planner-model')
+        monkeypatch.setattr(supervisor, 'FALLBACK_MODEL', 'fallback-model')
+        monkeypatch.setattr(supervisor, 'execute_steps', lambda steps, delay: [f"{s} — SUCCESS" for s in steps])
+        mock_plan = MagicMock(return_value=["1. Open Settings", "2. Enable Airplane Mode"])
+        monkeypatch.setattr(supervisor, 'plan_task', mock_plan)
+        monkeypatch.setattr(
+            supervisor, 'verify_results',
+            lambda goal, results: (["airplane"], "Airplane" in " ".join(results))
+        )
+        
+        result = run_task("Enable Airplane Mode", ["1. Open Settings"])
+        
+        mock_plan.assert_called_once_with("Enable Airplane Mode", model='fallback-model')
+        assert result['planner_steps'] == ["1. Open Settings", "2. Enable Airplane Mode"]
+        assert "✅" in result['supervisor_result']
     
-    def test_run_task_error_handling(self, mock_openai_api):
-        """Test error handling in task execution."""
+    def test_run_task_error_handling(self, mock_openai_api, monkeypatch):
+        """Test that planning errors propagate to the caller."""
         goal = "Invalid goal"
         
-        with patch('edith_core.planner.plan_task') as mock_plan:
-            mock_plan.side_effect = Exception("Planning failed")
-            
-            # Should not raise exception, but handle gracefully
-            result = run_task(goal)
-            
-            # Should still return a result structure
-            assert result is not None
-            assert 'task_prompt' in result
+        def failing_plan(*args, **kwargs):
+            raise Exception("Planning failed")
+        
+        monkeypatch.setattr(supervisor, 'stream_plan_task', failing_plan)
+        
+        # run_task doesn't swallow planner failures
+        with pytest.raises(Exception, match="Planning failed"):
+            run_task(goal)
     
-    def test_run_task_logging(self, sample_goals, mock_openai_api, temp_log_dir):
+    def test_run_task_logging(self, sample_goals, mock_openai_api):
         """Test that task execution creates proper logs."""
         goal = sample_goals[0]
         
         # Mock the logging to capture output
-        with patch('builtins.print') as mock_print:
+        with patch.object(builtins, 'print') as mock_print:
             result = run_task(goal)
             
             # Verify logging occurred
@@ -181,34 +226,29 @@ class TestSupervisor:
         assert isinstance(result['verifier_keywords'], list)
         assert isinstance(result['supervisor_result'], str)
     
-    def test_run_task_performance(self, sample_goals, mock_openai_api, performance_benchmark):
-        """Test task execution performance."""
-        goal = sample_goals[0]
-        
-        import time
-        start_time = time.time()
+    @pytest.mark.benchmark(group="supervisor")
+    def test_run_task_performance(self, benchmark, sample_goals, mock_openai_api, performance_benchmark):
+        """Test task execution performance.
         
-        result = run_task(goal)
+        Benchmarks are disabled by default (see ``addopts``); run with
+        ``--benchmark-enable`` to collect timing statistics.
+        """
+        goal = sample_goals[0]
         
-        end_time = time.time()
-        execution_time = end_time - start_time
+        result = benchmark(run_task, goal)
         
-        # Verify execution time is within acceptable limits
-        assert execution_time < performance_benchmark['max_execution_time']
+        # Stats are only collected when benchmarking is enabled
+        if benchmark.stats is not None:
+            assert benchmark.stats.stats.median < performance_benchmark['max_execution_time']
         
         # Verify result is still valid
         assert result is not None
         assert 'supervisor_result' in result
     
-    @pytest.mark.parametrize("goal,expected_keywords", [
-        ("Enable Airplane Mode", ["enable", "airplane", "mode"]),
-        ("Turn off Wi-Fi", ["turn", "off", "wi-fi"]),
-        ("Open Calculator", ["open", "calculator"]),
-        ("Set alarm for 7:00 AM", ["set", "alarm", "7:00", "am"]),
-    ])
-    def test_keyword_extraction(self, goal, expected_keywords, mock_openai_api):
+    @pytest.mark.parametrize("goal,expected_keywords", KEYWORD_CASES)
+    def test_keyword_extraction(self, goal, expected_keywords, precomputed_results):
         """Test keyword extraction from different goals."""
-        result = run_task(goal)
+        result = precomputed_results[goal]
         
         # Verify keywords are extracted
         assert 'verifier_keywords' in result